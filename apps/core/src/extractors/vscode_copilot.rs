@@ -8,10 +8,157 @@ use crate::utils::wsl;
 use anyhow::Result;
 use chrono::{TimeZone, Utc};
 use rayon::prelude::*;
+use serde::de::{self, Deserializer, IgnoredAny, MapAccess, SeqAccess, Visitor};
+use serde::Deserialize;
 use serde_json::Value;
-use std::io::BufRead;
+use std::borrow::Cow;
+use std::fmt;
+use std::io::{BufRead, Read};
 use std::path::{Path, PathBuf};
 
+/// Session-level fields needed for quick metadata, shared by the legacy JSON
+/// document and the `v` object of the JSONL header line.
+/// Scalars stay as `Value` and `requests` accepts any JSON type, so an unexpected
+/// type is ignored instead of failing the parse.
+#[derive(Deserialize)]
+#[serde(rename_all = "camelCase")]
+struct SessionSummary {
+    #[serde(default)]
+    session_id: Value,
+    #[serde(default)]
+    custom_title: Value,
+    #[serde(default)]
+    creation_date: Value,
+    /// `message.text` of the first request; the remaining requests are skipped unbuilt.
+    #[serde(default, rename = "requests", deserialize_with = "first_request_text")]
+    first_request_text: Option<String>,
+}
+
+impl SessionSummary {
+    /// Parse a session object. Documents the struct rejects (e.g. duplicate keys)
+    /// fall back to probing a full `Value`, so they still yield metadata.
+    fn from_slice(bytes: &[u8]) -> Option<Self> {
+        serde_json::from_slice(bytes).ok().or_else(|| {
+            let json: Value = serde_json::from_slice(bytes).ok()?;
+            Some(Self::from_value(&json))
+        })
+    }
+
+    /// Parse a JSONL header line (kind=0), where session metadata lives in `v`.
+    fn from_jsonl_header(bytes: &[u8]) -> Option<Self> {
+        #[derive(Deserialize)]
+        struct JsonlHeader {
+            v: SessionSummary,
+        }
+
+        serde_json::from_slice::<JsonlHeader>(bytes)
+            .ok()
+            .map(|header| header.v)
+            .or_else(|| {
+                let wrapper: Value = serde_json::from_slice(bytes).ok()?;
+                Some(Self::from_value(wrapper.get("v")?))
+            })
+    }
+
+    fn from_value(json: &Value) -> Self {
+        Self {
+            session_id: json.get("sessionId").cloned().unwrap_or_default(),
+            custom_title: json.get("customTitle").cloned().unwrap_or_default(),
+            creation_date: json.get("creationDate").cloned().unwrap_or_default(),
+            first_request_text: json
+                .get("requests")
+                .and_then(|r| r.as_array())
+                .and_then(|arr| arr.first())
+                .and_then(request_text),
+        }
+    }
+}
+
+/// `message.text` of a single chat request, if present.
+fn request_text(request: &Value) -> Option<String> {
+    request
+        .get("message")
+        .and_then(|msg| msg.get("text"))
+        .and_then(|t| t.as_str())
+        .map(|s| s.to_string())
+}
+
+/// Deserialize `requests` keeping only the first request's message text.
+/// Later requests (the bulk of a legacy session file) are consumed as `IgnoredAny`,
+/// so no `Value` tree is allocated for them. A non-array `requests` yields `None`.
+fn first_request_text<'de, D>(deserializer: D) -> Result<Option<String>, D::Error>
+where
+    D: Deserializer<'de>,
+{
+    struct FirstRequestText;
+
+    impl<'de> Visitor<'de> for FirstRequestText {
+        type Value = Option<String>;
+
+        fn expecting(&self, f: &mut fmt::Formatter) -> fmt::Result {
+            f.write_str("an array of chat requests")
+        }
+
+        fn visit_seq<A: SeqAccess<'de>>(self, mut seq: A) -> Result<Self::Value, A::Error> {
+            let text = seq
+                .next_element::<Value>()?
+                .and_then(|req| request_text(&req));
+            while seq.next_element::<IgnoredAny>()?.is_some() {}
+            Ok(text)
+        }
+
+        fn visit_map<A: MapAccess<'de>>(self, mut map: A) -> Result<Self::Value, A::Error> {
+            while map.next_entry::<IgnoredAny, IgnoredAny>()?.is_some() {}
+            Ok(None)
+        }
+
+        fn visit_unit<E: de::Error>(self) -> Result<Self::Value, E> {
+            Ok(None)
+        }
+
+        fn visit_bool<E: de::Error>(self, _: bool) -> Result<Self::Value, E> {
+            Ok(None)
+        }
+
+        fn visit_i64<E: de::Error>(self, _: i64) -> Result<Self::Value, E> {
+            Ok(None)
+        }
+
+        fn visit_u64<E: de::Error>(self, _: u64) -> Result<Self::Value, E> {
+            Ok(None)
+        }
+
+        fn visit_f64<E: de::Error>(self, _: f64) -> Result<Self::Value, E> {
+            Ok(None)
+        }
+
+        fn visit_str<E: de::Error>(self, _: &str) -> Result<Self::Value, E> {
+            Ok(None)
+        }
+    }
+
+    deserializer.deserialize_any(FirstRequestText)
+}
+
+/// Truncate a title to 60 characters, appending "..." when shortened.
+/// Finds the cut point in a single pass and slices on that char boundary.
+fn truncate_title(s: &str) -> String {
+    match s.char_indices().nth(60) {
+        Some((idx, _)) => format!("{}...", &s[..idx]),
+        None => s.to_string(),
+    }
+}
+
+/// One line of a JSONL chat session, reduced to the fields needed to find
+/// the first user message. `v` borrows from the line buffer when it has no escapes;
+/// lines whose `v` is not a string fail to deserialize and are skipped.
+#[derive(Deserialize)]
+struct JsonlEntry<'a> {
+    kind: i64,
+    #[serde(borrow)]
+    v: Cow<'a, str>,
+}
+
 /// VS Code Copilot Extractor
 pub struct VSCodeCopilotExtractor {
     /// Paths that may contain workspaceStorage
@@ -78,24 +225,32 @@ impl VSCodeCopilotExtractor {
     ) -> Option<SessionMetadata> {
         let is_jsonl = path.extension().is_some_and(|ext| ext == "jsonl");
 
-        let json = if is_jsonl {
+        // Open once: the JSONL title fallback keeps reading from the same reader
+        let file = std::fs::File::open(path).ok()?;
+        // Get file size from the open handle (no extra stat by path)
+        let file_size = file.metadata().map(|m| m.len()).unwrap_or(0);
+        let mut reader = std::io::BufReader::new(file);
+        // Reuse one line buffer instead of allocating a String per line
+        let mut line = Vec::new();
+
+        let summary = if is_jsonl {
             // JSONL format: first line is kind=0 (session header), data in "v" field
-            let file = std::fs::File::open(path).ok()?;
-            let reader = std::io::BufReader::new(file);
-            let first_line = reader.lines().next()?.ok()?;
-            let wrapper: Value = serde_json::from_str(&first_line).ok()?;
-            // Extract the "v" object which contains session metadata
-            wrapper.get("v")?.clone()
+            reader.read_until(b'\n', &mut line).ok()?;
+            SessionSummary::from_jsonl_header(&line)?
         } else {
-            // Legacy JSON format: entire file is the session object
-            let content = std::fs::read_to_string(path).ok()?;
-            serde_json::from_str(&content).ok()?
+            // Legacy JSON format: entire file is the session object.
+            // Parse raw bytes: serde_json validates UTF-8 inside strings as it goes,
+            // so a separate whole-file validation pass is not needed.
+            // Only the summary fields are built; the requests array is skipped.
+            let mut content = Vec::with_capacity(file_size as usize);
+            reader.read_to_end(&mut content).ok()?;
+            SessionSummary::from_slice(&content)?
         };
 
         // Get session ID from filename or JSON
-        let session_id = json
-            .get("sessionId")
-            .and_then(|v| v.as_str())
+        let session_id = summary
+            .session_id
+            .as_str()
             .map(|s| s.to_string())
             .unwrap_or_else(|| {
                 path.file_stem()
@@ -105,47 +260,32 @@ impl VSCodeCopilotExtractor {
             });
 
         // Get title if available
-        let title = json
-            .get("customTitle")
-            .and_then(|v| v.as_str())
+        let title = summary
+            .custom_title
+            .as_str()
             .map(|s| s.to_string())
             .or_else(|| {
                 // Fallback: get text from first request (works for legacy JSON)
-                json.get("requests")
-                    .and_then(|r| r.as_array())
-                    .and_then(|arr| arr.first())
-                    .and_then(|req| req.get("message"))
-                    .and_then(|msg| msg.get("text"))
-                    .and_then(|t| t.as_str())
-                    .map(|s| {
-                        let truncated: String = s.chars().take(60).collect();
-                        if s.chars().count() > 60 {
-                            format!("{}...", truncated)
-                        } else {
-                            truncated
-                        }
-                    })
+                summary.first_request_text.as_deref().map(truncate_title)
             })
             .or_else(|| {
                 // Fallback for JSONL: read subsequent lines to find first user message
                 if !is_jsonl {
                     return None;
                 }
-                let file = std::fs::File::open(path).ok()?;
-                let reader = std::io::BufReader::new(file);
-                // Skip first line (header), look for kind=1 with string value (user message)
-                for line in reader.lines().skip(1).take(20).flatten() {
-                    if let Ok(obj) = serde_json::from_str::<Value>(&line) {
-                        if obj.get("kind").and_then(|k| k.as_i64()) == Some(1) {
-                            if let Some(text) = obj.get("v").and_then(|v| v.as_str()) {
-                                if !text.is_empty() && text.len() > 5 {
-                                    let truncated: String = text.chars().take(60).collect();
-                                    return if text.chars().count() > 60 {
-                                        Some(format!("{}...", truncated))
-                                    } else {
-                                        Some(truncated)
-                                    };
-                                }
+                // Reader is already past the header line
+                // Look for kind=1 with string value (user message) in the next 20 lines
+                for _ in 0..20 {
+                    line.clear();
+                    match reader.read_until(b'\n', &mut line) {
+                        Ok(0) | Err(_) => break,
+                        Ok(_) => {}
+                    }
+                    if let Ok(entry) = serde_json::from_slice::<JsonlEntry>(&line) {
+                        if entry.kind == 1 {
+                            let text = entry.v.as_ref();
+                            if !text.is_empty() && text.len() > 5 {
+                                return Some(truncate_title(text));
                             }
                         }
                     }
@@ -154,14 +294,11 @@ impl VSCodeCopilotExtractor {
             });
 
         // Get timestamp
-        let created_at = json
-            .get("creationDate")
-            .and_then(|v| v.as_i64())
+        let created_at = summary
+            .creation_date
+            .as_i64()
             .and_then(|ts| Utc.timestamp_millis_opt(ts).single());
 
-        // Get file size
-        let file_size = std::fs::metadata(path).map(|m| m.len()).unwrap_or(0);
-
         Some(SessionMetadata {
             id: session_id,
             source: "vscode-copilot".to_string(),
@@ -301,3 +438,139 @@ impl Extractor for VSCodeCopilotExtractor {
         Ok(count)
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use tempfile::TempDir;
+
+    fn extractor() -> VSCodeCopilotExtractor {
+        VSCodeCopilotExtractor {
+            storage_paths: Vec::new(),
+        }
+    }
+
+    #[test]
+    fn test_truncate_title() {
+        assert_eq!(truncate_title("short"), "short");
+        let exact = "a".repeat(60);
+        assert_eq!(truncate_title(&exact), exact);
+        // Multi-byte characters are cut on a char boundary, not a byte offset
+        let long = "é".repeat(61);
+        assert_eq!(truncate_title(&long), format!("{}...", "é".repeat(60)));
+    }
+
+    #[test]
+    fn test_quick_metadata_legacy_json() {
+        let temp = TempDir::new().unwrap();
+        let path = temp.path().join("legacy.json");
+        std::fs::write(
+            &path,
+            r#"{"version":3,"requests":[
+                {"message":{"text":"Explain this function"},"response":[{"value":"..."}]},
+                {"message":{"text":"Second question"}}
+            ],"sessionId":"abc-123","creationDate":1700000000000}"#,
+        )
+        .unwrap();
+
+        let metadata = extractor()
+            .extract_quick_metadata(&path, "project")
+            .unwrap();
+        assert_eq!(metadata.id, "abc-123");
+        assert_eq!(metadata.title.as_deref(), Some("Explain this function"));
+        assert_eq!(
+            metadata.created_at.map(|t| t.timestamp_millis()),
+            Some(1700000000000)
+        );
+        assert_eq!(metadata.file_size, std::fs::metadata(&path).unwrap().len());
+    }
+
+    #[test]
+    fn test_quick_metadata_jsonl_falls_back_to_first_user_message() {
+        let temp = TempDir::new().unwrap();
+        let path = temp.path().join("session-id.jsonl");
+        std::fs::write(
+            &path,
+            concat!(
+                r#"{"kind":0,"v":{"sessionId":"jsonl-1","creationDate":1700000000000,"requests":[]}}"#,
+                "\n",
+                r#"{"kind":2,"v":{"state":"idle"}}"#,
+                "\n",
+                r#"{"kind":1,"v":"Refactor the \"parser\" module"}"#,
+                "\n",
+            ),
+        )
+        .unwrap();
+
+        let metadata = extractor()
+            .extract_quick_metadata(&path, "project")
+            .unwrap();
+        assert_eq!(metadata.id, "jsonl-1");
+        assert_eq!(
+            metadata.title.as_deref(),
+            Some("Refactor the \"parser\" module")
+        );
+    }
+
+    #[test]
+    fn test_quick_metadata_tolerates_unexpected_requests() {
+        let temp = TempDir::new().unwrap();
+        for (name, content) in [
+            ("map", r#"{"sessionId":"s1","requests":{}}"#),
+            ("string", r#"{"sessionId":"s1","requests":"none"}"#),
+            (
+                "null-first",
+                r#"{"sessionId":"s1","requests":[null,{"message":{"text":"x"}}]}"#,
+            ),
+            (
+                "no-message",
+                r#"{"sessionId":"s1","requests":[{"message":"hi"}]}"#,
+            ),
+        ] {
+            let path = temp.path().join(format!("{}.json", name));
+            std::fs::write(&path, content).unwrap();
+
+            let metadata = extractor()
+                .extract_quick_metadata(&path, "project")
+                .unwrap_or_else(|| panic!("session dropped for {}", name));
+            assert_eq!(metadata.id, "s1");
+            assert_eq!(metadata.title, None);
+        }
+    }
+
+    #[test]
+    fn test_quick_metadata_duplicate_keys_fall_back_to_value() {
+        let temp = TempDir::new().unwrap();
+        let path = temp.path().join("dup.json");
+        std::fs::write(
+            &path,
+            r#"{"sessionId":"old","requests":[{"message":{"text":"Hello there"}}],"sessionId":"new"}"#,
+        )
+        .unwrap();
+
+        let metadata = extractor()
+            .extract_quick_metadata(&path, "project")
+            .unwrap();
+        // Same as serde_json::Value: last duplicate wins
+        assert_eq!(metadata.id, "new");
+        assert_eq!(metadata.title.as_deref(), Some("Hello there"));
+    }
+
+    #[test]
+    fn test_quick_metadata_prefers_custom_title() {
+        let temp = TempDir::new().unwrap();
+        let path = temp.path().join("titled.json");
+        std::fs::write(
+            &path,
+            r#"{"customTitle":"My title","requests":[{"message":{"text":"Hello there"}}]}"#,
+        )
+        .unwrap();
+
+        let metadata = extractor()
+            .extract_quick_metadata(&path, "project")
+            .unwrap();
+        // No sessionId in file: falls back to file stem
+        assert_eq!(metadata.id, "titled");
+        assert_eq!(metadata.title.as_deref(), Some("My title"));
+    }
+}
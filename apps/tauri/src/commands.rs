@@ -1096,16 +1096,22 @@ pub async fn open_url(url: String) -> Result<(), String> {
 #[tauri::command]
 pub async fn read_file_content(path: String) -> Result<String, String> {
     use std::fs;
+    use std::io::Read;
 
     let path = std::path::Path::new(&path);
 
-    if !path.exists() {
-        return Err(format!("File not found: {}", path.display()));
-    }
+    // Mở file một lần rồi dùng lại handle, thay vì exists() + metadata() + mở lại
+    let mut file = match fs::File::open(path) {
+        Ok(file) => file,
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => {
+            return Err(format!("File not found: {}", path.display()));
+        }
+        Err(e) => return Err(format!("Failed to read file: {}", e)),
+    };
 
     // Giới hạn 50MB
     const MAX_SIZE: u64 = 50 * 1024 * 1024;
-    let metadata = fs::metadata(path).map_err(|e| e.to_string())?;
+    let metadata = file.metadata().map_err(|e| e.to_string())?;
 
     if metadata.len() > MAX_SIZE {
         return Err(format!(
@@ -1115,7 +1121,10 @@ pub async fn read_file_content(path: String) -> Result<String, String> {
         ));
     }
 
-    fs::read_to_string(path).map_err(|e| format!("Failed to read file: {}", e))
+    let mut content = String::new();
+    file.read_to_string(&mut content)
+        .map_err(|e| format!("Failed to read file: {}", e))?;
+    Ok(content)
 }
 
 // ============ SETTINGS COMMANDS ============